@@ -0,0 +1,649 @@
+"""Organization Hierarchy: columnar analysis snapshots
+
+=== Module description ===
+This module contains OrgSnapshot, a struct-of-arrays snapshot of an
+Organization for export and analysis. Every field of every employee is kept
+in a NumPy column, so queries over the whole organization run as vectorized
+column operations instead of walking a graph of Employee objects.
+
+An OrgSnapshot is not a storage engine behind Organization: it is taken from
+an Organization with OrgSnapshot.from_organization, and can be turned back
+into a new Organization with to_organization. Changes made through the
+Organization afterwards are not seen by the snapshot, and changes made to the
+snapshot (such as firing employees to see the result) are not seen by the
+Organization.
+
+This module requires NumPy. organization_hierarchy does not import it, so the
+rest of the program works without NumPy installed.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Union
+import numpy as np
+from organization_hierarchy import Employee, Leader, Organization, \
+    paused_gc, traverse
+
+
+class OrgSnapshot:
+    """The employees of an organization stored as one NumPy column per field.
+
+    Row i of every column describes the same employee. Rows are in no
+    particular order; the snapshot keeps a separate eid order for lookups.
+
+    === Private Attributes ===
+    _eids:
+        The eid of each employee.
+    _superiors:
+        The row of the superior of each employee, or -1 for the head.
+    _salaries:
+        The salary of each employee.
+    _int_salaries:
+        Whether each employee's salary is an int rather than a float.
+    _ratings:
+        The rating of each employee.
+    _names:
+        The name of each employee.
+    _positions:
+        The id of each employee's position in _position_names.
+    _departments:
+        The id of the department each Leader leads in _department_names, or
+        -1 for employees who are not Leaders.
+    _position_names:
+        The distinct positions, indexed by position id.
+    _position_ids:
+        The id of each position in _position_names.
+    _department_names:
+        The distinct department names, indexed by department id.
+    _head:
+        The row of the head of the organization, or -1 if it is empty.
+    _by_eid:
+        The rows of all employees, in order of ascending eid.
+
+    === Representation Invariants ===
+    - All columns and _by_eid have the same length.
+    - Exactly one row has no superior iff the snapshot is not empty, and it is
+      the row _head.
+    - _position_ids[_position_names[i]] == i for every position id i.
+    """
+    _eids: np.ndarray
+    _superiors: np.ndarray
+    _salaries: np.ndarray
+    _int_salaries: np.ndarray
+    _ratings: np.ndarray
+    _names: List[str]
+    _positions: np.ndarray
+    _departments: np.ndarray
+    _position_names: List[str]
+    _position_ids: Dict[str, int]
+    _department_names: List[str]
+    _head: int
+    _by_eid: np.ndarray
+
+    def __init__(self) -> None:
+        """Initialize an empty OrgSnapshot.
+
+        >>> len(OrgSnapshot())
+        0
+        >>> OrgSnapshot().get_head() is None
+        True
+        """
+        self._eids = np.zeros(0, dtype=np.int64)
+        self._superiors = np.zeros(0, dtype=np.int64)
+        self._salaries = np.zeros(0, dtype=np.float64)
+        self._int_salaries = np.zeros(0, dtype=np.bool_)
+        self._ratings = np.zeros(0, dtype=np.int64)
+        self._names = []
+        self._positions = np.zeros(0, dtype=np.int32)
+        self._departments = np.zeros(0, dtype=np.int32)
+        self._position_names = []
+        self._position_ids = {}
+        self._department_names = []
+        self._head = -1
+        self._by_eid = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_organization(cls, organization: Organization) -> OrgSnapshot:
+        """Return an OrgSnapshot holding the employees of <organization>.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Leader(2, "Sue Perior", "Manager", 20000, 30, "Sales")
+        >>> e1.become_subordinate(e2)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e2))
+        >>> len(snapshot)
+        2
+        >>> snapshot.get_head().name
+        'Sue Perior'
+        """
+        snapshot = cls()
+        head = organization.get_head()
+        if head is None:
+            return snapshot
+        eids = []
+        superiors = []
+        salaries = []
+        int_salaries = []
+        ratings = []
+        positions = []
+        departments = []
+        department_ids = {}
+        rows = {}
+        for employee in traverse(head, 'pre', True):
+            rows[id(employee)] = len(eids)
+            eids.append(employee.eid)
+            if employee is head:
+                superiors.append(-1)
+            else:
+                superiors.append(rows[id(employee.get_superior())])
+            salaries.append(employee.salary)
+            int_salaries.append(isinstance(employee.salary, int))
+            ratings.append(employee.rating)
+            snapshot._names.append(employee.name)
+            positions.append(snapshot._position_id(employee.position))
+            if isinstance(employee, Leader):
+                departments.append(department_ids.setdefault(
+                    employee.get_department_name(), len(department_ids)))
+            else:
+                departments.append(-1)
+
+        snapshot._eids = np.array(eids, dtype=np.int64)
+        snapshot._superiors = np.array(superiors, dtype=np.int64)
+        snapshot._salaries = np.array(salaries, dtype=np.float64)
+        snapshot._int_salaries = np.array(int_salaries, dtype=np.bool_)
+        snapshot._ratings = np.array(ratings, dtype=np.int64)
+        snapshot._positions = np.array(positions, dtype=np.int32)
+        snapshot._departments = np.array(departments, dtype=np.int32)
+        snapshot._department_names = list(department_ids)
+        snapshot._head = 0
+        snapshot._by_eid = np.argsort(snapshot._eids, kind='stable')
+        return snapshot
+
+    def _position_id(self, position: str) -> int:
+        """Return the id of <position>, giving it a new id if it has none.
+
+        >>> snapshot = OrgSnapshot()
+        >>> snapshot._position_id('Worker'), snapshot._position_id('Manager')
+        (0, 1)
+        >>> snapshot._position_id('Worker')
+        0
+        """
+        position_id = self._position_ids.get(position)
+        if position_id is None:
+            position_id = len(self._position_names)
+            self._position_ids[position] = position_id
+            self._position_names.append(position)
+        return position_id
+
+    def to_organization(self) -> Organization:
+        """Return a new Organization with the employees in this snapshot.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Leader(2, "Sue Perior", "Manager", 20000.5, 30, "Sales")
+        >>> e1.become_subordinate(e2)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e2))
+        >>> o = snapshot.to_organization()
+        >>> o.get_head().get_department_name()
+        'Sales'
+        >>> o.get_head().salary
+        20000.5
+        >>> o.get_employee(1).get_superior() is o.get_head()
+        True
+        """
+        if self._head < 0:
+            return Organization()
+        with paused_gc():
+            employees = [self._create_employee(row)
+                         for row in range(len(self))]
+            # Linking in order of (superior, eid) appends every Employee's
+            # subordinates already sorted.
+            order = np.lexsort((self._eids, self._superiors))
+            superiors = self._superiors.tolist()
+            for row in order.tolist():
+                superior_row = superiors[row]
+                if superior_row >= 0:
+                    employee = employees[row]
+                    superior = employees[superior_row]
+                    employee._superior = superior
+                    superior._writable_subordinates().append_unsorted(
+                        employee)
+            return Organization(employees[self._head])
+
+    def _create_employee(self, row: int) -> Employee:
+        """Return a new Employee (or Leader) with the fields of row <row>.
+        """
+        salary = float(self._salaries[row])
+        if self._int_salaries[row]:
+            salary = int(salary)
+        args = (int(self._eids[row]), self._names[row],
+                self._position_names[self._positions[row]], salary,
+                int(self._ratings[row]))
+        department = self._departments[row]
+        if department < 0:
+            return Employee(*args)
+        return Leader(*args, self._department_names[department])
+
+    def __len__(self) -> int:
+        """Return the number of employees in this snapshot.
+
+        >>> len(OrgSnapshot.from_organization(
+        ...     Organization(Employee(1, "Emma Ployee", "Worker", 10000, 50))))
+        1
+        """
+        return len(self._eids)
+
+    def get_head(self) -> Optional[SnapshotEmployee]:
+        """Return the head of the organization, or None if it is empty.
+
+        >>> snapshot = OrgSnapshot.from_organization(
+        ...     Organization(Employee(1, "Emma Ployee", "Worker", 10000, 50)))
+        >>> snapshot.get_head().eid
+        1
+        """
+        if self._head < 0:
+            return None
+        return SnapshotEmployee(self, self._head)
+
+    def get_employee(self, eid: int) -> Optional[SnapshotEmployee]:
+        """Return the employee with id <eid>, or None if there is no such
+        employee.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e1.become_subordinate(e2)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e2))
+        >>> snapshot.get_employee(1).get_superior().name
+        'Sue Perior'
+        >>> snapshot.get_employee(3) is None
+        True
+        """
+        i = int(np.searchsorted(self._eids, eid, sorter=self._by_eid))
+        if i < len(self._by_eid):
+            row = int(self._by_eid[i])
+            if self._eids[row] == eid:
+                return SnapshotEmployee(self, row)
+        return None
+
+    def get_average_salary(self, position: Optional[str] = None) -> float:
+        """Return the average salary of all employees with the position
+        <position>, or of all employees if <position> is None.
+
+        If there are no such employees, return 0.0
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e3 = Employee(3, "Emma Watson", "Worker", 30000, 50)
+        >>> e1.become_subordinate(e2)
+        >>> e3.become_subordinate(e2)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e2))
+        >>> snapshot.get_average_salary()
+        20000.0
+        >>> snapshot.get_average_salary('Worker')
+        20000.0
+        >>> snapshot.get_average_salary('CEO')
+        0.0
+        """
+        if position is None:
+            salaries = self._salaries
+        else:
+            position_id = self._position_ids.get(position)
+            if position_id is None:
+                return 0.0
+            salaries = self._salaries[self._positions == position_id]
+        if len(salaries) == 0:
+            return 0.0
+        return float(salaries.mean())
+
+    def get_employees_paid_more_than(self, amount: float) \
+            -> List[SnapshotEmployee]:
+        """Return all employees with a salary higher than <amount>, in
+        increasing order of eid.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e3 = Employee(3, "Bigg Boss", "CEO", 50000, 60)
+        >>> e1.become_subordinate(e2)
+        >>> e2.become_subordinate(e3)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e3))
+        >>> [e.name for e in snapshot.get_employees_paid_more_than(15000)]
+        ['Sue Perior', 'Bigg Boss']
+        """
+        return self._in_eid_order(self._salaries > amount)
+
+    def get_employees_with_position(self, position: str) \
+            -> List[SnapshotEmployee]:
+        """Return all employees with the position <position>, in increasing
+        order of eid.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e5 = Employee(5, "The Rock", "Worker", 15000, 15)
+        >>> e5.become_subordinate(e2)
+        >>> e1.become_subordinate(e2)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e2))
+        >>> [e.eid for e in snapshot.get_employees_with_position('Worker')]
+        [1, 5]
+        >>> snapshot.get_employees_with_position('CEO')
+        []
+        """
+        position_id = self._position_ids.get(position)
+        if position_id is None:
+            return []
+        return self._in_eid_order(self._positions == position_id)
+
+    def _in_eid_order(self, mask: np.ndarray) -> List[SnapshotEmployee]:
+        """Return the employees in the rows selected by the boolean column
+        <mask>, in increasing order of eid.
+        """
+        rows = self._by_eid[mask[self._by_eid]]
+        return [SnapshotEmployee(self, row) for row in rows.tolist()]
+
+    def fire_under_rating(self, rating: int) -> None:
+        """Fire all employees with a rating below <rating>, with the same
+        result as Organization.fire_under_rating.
+
+        Employees are removed together rather than one by one: every
+        remaining employee's new superior is their closest remaining
+        superior. The replacement of every head that could be fired is
+        found in a single vectorized pass, so a chain of replaced heads is
+        followed in O(1) time per head.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e3 = Employee(3, "Bigg Boss", "CEO", 50000, 60)
+        >>> e4 = Employee(4, "Emma Watson", "Manager", 30000, 50)
+        >>> e5 = Employee(5, "The Rock", "Worker", 15000, 15)
+        >>> e1.become_subordinate(e2)
+        >>> e2.become_subordinate(e3)
+        >>> e4.become_subordinate(e3)
+        >>> e5.become_subordinate(e4)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e3))
+        >>> snapshot.fire_under_rating(35)
+        >>> len(snapshot)
+        3
+        >>> snapshot.get_employee(1).get_superior().name
+        'Bigg Boss'
+        >>> snapshot.fire_under_rating(55)
+        >>> [e.name for e in snapshot.get_employees_paid_more_than(0)]
+        ['Bigg Boss']
+        """
+        fired = self._ratings < rating
+        if not fired.any():
+            return
+        count = len(self)
+        rows = np.arange(count)
+
+        # The time at which each employee is fired: their place in the
+        # order of (rating, eid), or <count> if they are not fired.
+        order = np.lexsort((self._eids, self._ratings))
+        fire_time = np.full(count, count, dtype=np.int64)
+        fire_order = order[fired[order]]
+        fire_time[fire_order] = np.arange(len(fire_order))
+
+        # The latest time at which any of each employee's superiors is fired.
+        # At time t, the employees not yet fired whose superiors have all
+        # been fired are exactly the subordinates of the head.
+        latest_superior = self._reduce_superiors(fire_time, np.maximum, -1)
+
+        # The head fired at time t is replaced by the best rated employee
+        # among those who are subordinates of the head at time t. This is
+        # found for every t at once, so following the replacements costs
+        # O(1) per replaced head.
+        replacements = self._find_replacements(
+            fire_time, latest_superior, len(fire_order))
+        head = self._head
+        while head >= 0 and fired[head]:
+            head = int(replacements[fire_time[head]])
+
+        kept = ~fired
+        if head < 0:
+            kept[:] = False
+        superiors = self._closest_kept_superiors(kept)
+        if head >= 0:
+            superiors[(superiors < 0) & (rows != head)] = head
+            superiors[head] = -1
+
+        new_rows = np.cumsum(kept) - 1
+        superiors = superiors[kept]
+        superiors[superiors >= 0] = new_rows[superiors[superiors >= 0]]
+        self._superiors = superiors
+        self._eids = self._eids[kept]
+        self._salaries = self._salaries[kept]
+        self._int_salaries = self._int_salaries[kept]
+        self._ratings = self._ratings[kept]
+        self._names = [name for name, keep
+                       in zip(self._names, kept.tolist()) if keep]
+        self._positions = self._positions[kept]
+        self._departments = self._departments[kept]
+        self._head = int(new_rows[head]) if head >= 0 else -1
+        self._by_eid = np.argsort(self._eids, kind='stable')
+
+    def _find_replacements(self, fire_time: np.ndarray,
+                           latest_superior: np.ndarray,
+                           times: int) -> np.ndarray:
+        """Return, for every time t in range(<times>), the row of the highest
+        rated employee (the lowest eid first in case of a tie) that is not
+        fired by time t while all of their superiors are, or -1 if there is
+        no such employee.
+
+        Each employee is such a candidate for the times in the range
+        [latest_superior, fire_time). The ranges are split into the nodes of
+        a segment tree over the times, which keep the best candidate whose
+        range covers them. Pushing the best candidates down to the leaves
+        answers every time in O(log times) vectorized passes.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e3 = Employee(3, "Bigg Boss", "CEO", 50000, 60)
+        >>> e1.become_subordinate(e3)
+        >>> e2.become_subordinate(e3)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e3))
+        >>> [snapshot.get_employee(eid)._row for eid in (3, 1, 2)]
+        [0, 1, 2]
+        >>> snapshot._find_replacements(np.array([0, 1, 3]),
+        ...                          np.array([-1, 0, 0]), 2).tolist()
+        [1, 2]
+        >>> snapshot._find_replacements(np.array([0, 1, 2]),
+        ...                          np.array([-1, 0, 0]), 3).tolist()
+        [1, 2, -1]
+        """
+        if times == 0:
+            return np.zeros(0, dtype=np.int64)
+        # The rows in order of preference, and each row's place in it.
+        by_preference = np.lexsort((self._eids, -self._ratings))
+        preference = np.empty(len(self), dtype=np.int64)
+        preference[by_preference] = np.arange(len(self))
+
+        size = 1
+        while size < times:
+            size *= 2
+        none = len(self)
+        best = np.full(2 * size, none, dtype=np.int64)
+        low = np.maximum(latest_superior, 0)
+        high = np.minimum(fire_time, times)
+        candidates = np.flatnonzero(low < high)
+        low = low[candidates] + size
+        high = high[candidates] + size
+        ranks = preference[candidates]
+        while len(ranks):
+            odd = (low & 1) == 1
+            np.minimum.at(best, low[odd], ranks[odd])
+            low[odd] += 1
+            odd = (high & 1) == 1
+            high[odd] -= 1
+            np.minimum.at(best, high[odd], ranks[odd])
+            low >>= 1
+            high >>= 1
+            left = low < high
+            low, high, ranks = low[left], high[left], ranks[left]
+        start = 1
+        while start < size:
+            parents = np.arange(start, 2 * start)
+            best[2 * parents] = np.minimum(best[2 * parents], best[parents])
+            best[2 * parents + 1] = np.minimum(best[2 * parents + 1],
+                                               best[parents])
+            start *= 2
+        leaves = best[size:size + times]
+        replacements = np.full(times, -1, dtype=np.int64)
+        found = leaves < none
+        replacements[found] = by_preference[leaves[found]]
+        return replacements
+
+    def _reduce_superiors(self, values: np.ndarray, combine: np.ufunc,
+                          empty: int) -> np.ndarray:
+        """Return, for every row, <values> of all of that row's superiors
+        combined with <combine>, or <empty> for the head.
+
+        Uses pointer jumping, so it takes O(log depth) vectorized passes.
+
+        >>> e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+        >>> e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+        >>> e3 = Employee(3, "Bigg Boss", "CEO", 50000, 60)
+        >>> e1.become_subordinate(e2)
+        >>> e2.become_subordinate(e3)
+        >>> snapshot = OrgSnapshot.from_organization(Organization(e3))
+        >>> ratings = snapshot._ratings
+        >>> snapshot._reduce_superiors(ratings, np.maximum, -1).tolist()
+        [-1, 60, 60]
+        """
+        # inclusive[i] combines i and their superiors strictly below jump[i].
+        inclusive = values.copy()
+        jump = self._superiors.copy()
+        active = np.flatnonzero(jump >= 0)
+        while len(active):
+            targets = jump[active]
+            inclusive[active] = combine(inclusive[active], inclusive[targets])
+            jump[active] = jump[targets]
+            active = active[jump[active] >= 0]
+        superiors = self._superiors
+        has_superior = superiors >= 0
+        result = np.full(len(self), empty, dtype=values.dtype)
+        result[has_superior] = inclusive[superiors[has_superior]]
+        return result
+
+    def _closest_kept_superiors(self, kept: np.ndarray) -> np.ndarray:
+        """Return, for every row, the row of its closest superior for which
+        <kept> is True, or -1 if there is none.
+        """
+        closest = self._superiors.copy()
+        active = np.flatnonzero(closest >= 0)
+        active = active[~kept[closest[active]]]
+        while len(active):
+            closest[active] = closest[closest[active]]
+            active = active[closest[active] >= 0]
+            active = active[~kept[closest[active]]]
+        return closest
+
+
+class SnapshotEmployee:
+    """A lightweight view of one employee in an OrgSnapshot.
+
+    Views are created on demand and hold no fields of their own. A view is
+    only valid until employees are next fired from its snapshot.
+
+    === Private Attributes ===
+    _snapshot:
+        The OrgSnapshot this employee is stored in.
+    _row:
+        The row of this employee in the columns of _snapshot.
+    """
+    __slots__ = ('_snapshot', '_row')
+    _snapshot: OrgSnapshot
+    _row: int
+
+    def __init__(self, snapshot: OrgSnapshot, row: int) -> None:
+        """Initialize a view of row <row> of <snapshot>.
+
+        >>> snapshot = OrgSnapshot.from_organization(
+        ...     Organization(Employee(1, "Emma Ployee", "Worker", 10000, 50)))
+        >>> SnapshotEmployee(snapshot, 0).name
+        'Emma Ployee'
+        """
+        self._snapshot = snapshot
+        self._row = row
+
+    @property
+    def eid(self) -> int:
+        """The ID number of the employee.
+
+        >>> OrgSnapshot.from_organization(Organization(
+        ...     Employee(1, "Emma Ployee", "Worker", 10000, 50))).get_head().eid
+        1
+        """
+        return int(self._snapshot._eids[self._row])
+
+    @property
+    def name(self) -> str:
+        """The name of the employee.
+        """
+        return self._snapshot._names[self._row]
+
+    @property
+    def position(self) -> str:
+        """The name of the employee's position within the organization.
+
+        >>> OrgSnapshot.from_organization(Organization(
+        ...     Employee(1, "Emma", "Worker", 10000, 50))).get_head().position
+        'Worker'
+        """
+        snapshot = self._snapshot
+        return snapshot._position_names[snapshot._positions[self._row]]
+
+    @property
+    def salary(self) -> Union[int, float]:
+        """The salary of the employee.
+
+        >>> OrgSnapshot.from_organization(Organization(
+        ...     Employee(1, "Emma", "Worker", 10000, 50))).get_head().salary
+        10000
+        """
+        salary = float(self._snapshot._salaries[self._row])
+        if self._snapshot._int_salaries[self._row]:
+            return int(salary)
+        return salary
+
+    @property
+    def rating(self) -> int:
+        """The rating of the employee.
+        """
+        return int(self._snapshot._ratings[self._row])
+
+    def get_superior(self) -> Optional[SnapshotEmployee]:
+        """Return the superior of this employee, or None for the head.
+
+        >>> OrgSnapshot.from_organization(Organization(Employee(
+        ...     1, "Emma", "Worker", 10000, 50))).get_head().get_superior()
+        """
+        superior = int(self._snapshot._superiors[self._row])
+        if superior < 0:
+            return None
+        return SnapshotEmployee(self._snapshot, superior)
+
+    def __eq__(self, other: object) -> bool:
+        """Return True iff <other> is a view of the same row of the same
+        snapshot.
+
+        >>> snapshot = OrgSnapshot.from_organization(
+        ...     Organization(Employee(1, "Emma", "Worker", 10000, 50)))
+        >>> snapshot.get_head() == snapshot.get_employee(1)
+        True
+        """
+        if not isinstance(other, SnapshotEmployee):
+            return NotImplemented
+        return self._snapshot is other._snapshot and self._row == other._row
+
+    def __hash__(self) -> int:
+        """Return a hash of this view.
+        """
+        return hash((id(self._snapshot), self._row))
+
+    def __repr__(self) -> str:
+        """Return a string representation of this view.
+
+        >>> OrgSnapshot.from_organization(Organization(
+        ...     Employee(1, "Emma", "Worker", 10000, 50))).get_head()
+        SnapshotEmployee(eid=1, name='Emma')
+        """
+        return 'SnapshotEmployee(eid={}, name={!r})'.format(self.eid, self.name)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,4 +1,12 @@
-from organization_hierarchy import Employee, Leader, Organization, DepartmentSalaryTree, create_department_salary_tree
+import os
+import random
+from io import StringIO
+
+import pytest
+
+from organization_hierarchy import Employee, Leader, Organization, DepartmentSalaryTree, create_department_salary_tree, \
+    create_organization_from_file, EmployeeFileError, RowProblem, DUPLICATE_EID, EXTRA_HEAD, MISSING_SUPERIOR, \
+    SUPERIOR_CYCLE, save_snapshot, load_snapshot, write_organization_to_file
 
 
 def test_become_subordinate() -> None:
@@ -18,6 +26,17 @@ def test_become_subordinate() -> None:
     assert a._subordinates[0] == c
 
 
+def test_direct_subordinates_sorted_view() -> None:
+    a = Employee(5, 'Alpha', 'Boss', 100, 100)
+    for eid in [9, 2, 7, 1]:
+        Employee(eid, str(eid), 'Worker', 10, 10).become_subordinate(a)
+    view = a.get_direct_subordinates()
+    assert [e.eid for e in view] == [1, 2, 7, 9]
+    a.remove_subordinate_id(7)
+    assert [e.eid for e in view] == [1, 2, 9]
+    assert not hasattr(view, 'append')
+
+
 def test_create_department_salary_tree() -> None:
     e1 = Leader(1, "Emma Ployee", "Worker", 15000, 50, 'Marketing')
     e2 = Employee(2, "Sue Perior", "Manager", 25000, 30)
@@ -54,6 +73,101 @@ def test_create_department_salary_tree_no_leaders() -> None:
     assert result is None
 
 
+def test_create_department_salary_tree_nested_departments() -> None:
+    e1 = Leader(1, "Emma Ployee", "Worker", 15000, 50, 'Marketing')
+    e2 = Employee(2, "Sue Perior", "Manager", 25000, 30)
+    e3 = Leader(3, "Bigg Boss", "CEO", 50000, 60, 'Sales')
+    e4 = Leader(4, "Emma Watson", "Manager", 30000, 50, 'Management')
+    e5 = Employee(5, "The Rock", "Worker", 10000, 15)
+    e2.become_subordinate(e1)
+    e3.become_subordinate(e2)
+    e4.become_subordinate(e3)
+    e5.become_subordinate(e4)
+    o = Organization(e1)
+    dst = create_department_salary_tree(o)
+    assert dst.salary == 20000.0
+    assert [d.department_name for d in dst.subdepartments] == \
+        ['Sales', 'Management']
+    sales, management = dst.subdepartments
+    assert sales.salary == 50000.0
+    assert [d.department_name for d in sales.subdepartments] == \
+        ['Management']
+    assert sales.subdepartments[0].salary == 20000.0
+    assert management.salary == 20000.0
+    assert management.subdepartments == []
+
+
+def test_department_salary_tree_follows_changes() -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    o.debug = True
+    assert o.get_department_salary_tree() is not None
+    leader = next(e for e in o.get_head().get_all_subordinates()
+                  if isinstance(e, Leader) and e.get_direct_subordinates())
+    worker = leader.get_direct_subordinates()[0]
+    o.add_employee(Employee(o.get_next_free_id(), 'New', 'Worker', 100, 50),
+                   worker.eid)
+    worker.salary += 1000
+    o.get_department_salary_tree()
+    new_leader = worker.become_leader('New Department')
+    o.get_department_salary_tree()
+    new_leader.become_employee()
+    o.get_department_salary_tree()
+    o.set_head(o.get_employee(worker.eid).change_department_leader())
+    o.get_department_salary_tree()
+    o.fire_employee(leader.eid)
+    totals = o._department_totals
+    assert o.get_department_salary_tree() is not None
+    assert o._department_totals is totals
+    o.fire_under_rating(50)
+    assert o._department_totals is totals
+    stats = o.get_department_cache_stats()
+    o.get_department_salary_tree()
+    head = o.get_head()
+    ids = [e.eid for e in head.get_direct_subordinates()[0].
+           get_all_subordinates()]
+    head.obtain_subordinates(ids)
+    assert o._department_totals is totals
+    assert o.get_department_salary_tree() is not None
+    assert o.get_department_cache_stats() == stats
+
+
+def test_employees_stay_in_their_organization() -> None:
+    e1 = Employee(1, "Emma Ployee", "Worker", 100, 50)
+    e2 = Employee(2, "Sue Perior", "Manager", 200, 40)
+    e3 = Employee(3, "Bigg Boss", "CEO", 300, 10)
+    e2.become_subordinate(e1)
+    e3.become_subordinate(e2)
+    o = Organization(e1)
+    with pytest.raises(ValueError):
+        Organization(e2)
+    with pytest.raises(ValueError):
+        Organization().add_employee(e3)
+    assert e3.get_organization_head() is e1
+    o.add_employee(Employee(4, "Emma Watson", "Manager", 400, 30), 3)
+    assert o.get_employee(4).get_superior() is e3
+    assert o.get_average_salary() == 250
+    o.fire_lowest_rated_employee()
+    assert o.get_employee(3) is None
+    assert o.get_head() is e1 and len(o.get_head().get_all_subordinates()) == 2
+
+
+def test_get_next_free_id_after_hiring_and_firing() -> None:
+    o = Organization()
+    for eid in (1, 2, 3, 5, 8):
+        o.add_employee(Employee(eid, 'E', 'Worker', 100, 100 - eid * 10), 1)
+    assert o.get_next_free_id() == 4
+    o.add_employee(Employee(4, 'E', 'Worker', 100, 50), 1)
+    assert o.get_next_free_id() == 6
+    o.fire_employee(2)
+    o.fire_under_rating(60)
+    assert o.get_next_free_id() == 2
+    o.add_employee(Employee(2, 'E', 'Worker', 100, 50), 1)
+    assert o.get_next_free_id() == 4
+    o.set_head(Employee(7, 'E', 'Worker', 100, 50))
+    assert o.get_next_free_id() == 1
+
+
 def test_obtain_subordinates_2_1() -> None:
     e1 = Employee(1, "1", "CEO", 15000, 1)
     e2 = Employee(2, "2", "Sub", 25000, 2)
@@ -94,6 +208,449 @@ def test_obtain_subordinates_1_2() -> None:
     assert head.get_direct_subordinates()[2].eid == 40
 
 
+INVALID_FILE = """1,Alice,CEO,500,90,,Company
+2,Bob,Worker,100,50,1
+2,Bobby,Worker,100,50,1
+3,Carol,CEO,400,80,
+4,Dan,Worker,100,40,99
+5,Erin,Worker,100,40,4
+6,Frank,Worker,100,40,7
+7,Gina,Worker,100,40,6
+8,Hal,Worker,100,40,7
+"""
+
+
+def test_create_organization_from_file_reports_problems() -> None:
+    with pytest.raises(EmployeeFileError) as info:
+        create_organization_from_file(StringIO(INVALID_FILE))
+    assert info.value.problems == [RowProblem(3, 2, DUPLICATE_EID),
+                                   RowProblem(4, 3, EXTRA_HEAD),
+                                   RowProblem(5, 4, MISSING_SUPERIOR),
+                                   RowProblem(7, 6, SUPERIOR_CYCLE),
+                                   RowProblem(8, 7, SUPERIOR_CYCLE)]
+
+
+def test_create_organization_from_file_drop() -> None:
+    o = create_organization_from_file(StringIO(INVALID_FILE), 'drop')
+    assert [e.eid for e in o.get_head().get_all_subordinates()] == [2]
+    assert o.get_employee(2).name == 'Bob'
+    assert o.get_employee(5) is None
+
+
+def test_create_organization_from_file_attach() -> None:
+    o = create_organization_from_file(StringIO(INVALID_FILE), 'attach')
+    head = o.get_head()
+    assert [e.eid for e in head.get_direct_subordinates()] == [2, 3, 4, 6]
+    assert [e.eid for e in head.get_all_subordinates()] == [2, 3, 4, 5, 6, 7, 8]
+    assert o.get_employee(7).get_superior().eid == 6
+    assert o.get_employee(8).get_superior().eid == 7
+
+
+def test_snapshot_round_trip(tmp_path) -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    path = str(tmp_path / 'employees.snapshot')
+    save_snapshot(o, path)
+    loaded = load_snapshot(path)
+    expected = [o.get_head()] + o.get_head().get_all_subordinates()
+    actual = [loaded.get_head()] + loaded.get_head().get_all_subordinates()
+    assert len(actual) == len(expected)
+    for old, new in zip(expected, actual):
+        assert (new.eid, new.name, new.position, new.salary, new.rating) == \
+            (old.eid, old.name, old.position, old.salary, old.rating)
+        assert type(new) is type(old)
+        assert new.get_department_name() == old.get_department_name()
+        if old.get_superior() is None:
+            assert new.get_superior() is None
+        else:
+            assert new.get_superior().eid == old.get_superior().eid
+
+
+def test_snapshot_indexes_built_after_changes(tmp_path) -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    path = str(tmp_path / 'employees.snapshot')
+    save_snapshot(o, path)
+    loaded = load_snapshot(path)
+    for org in (o, loaded):
+        org.get_employee(5).rating = 1
+        org.get_employee(7).salary = 123456
+        org.fire_employee(9)
+        org.add_employee(Employee(20, 'Zed', 'Intern', 1500.5, 40), 10)
+    assert loaded.get_average_salary() == o.get_average_salary()
+    assert [e.eid for e in loaded.get_employees_paid_more_than(10000)] == \
+        [e.eid for e in o.get_employees_paid_more_than(10000)]
+    assert [e.eid for e in loaded.get_employees_with_position('Worker')] == \
+        [e.eid for e in o.get_employees_with_position('Worker')]
+    for org in (o, loaded):
+        org.fire_lowest_rated_employee()
+    assert loaded.get_employee(5) is None
+    assert loaded.get_department_salary_tree().salary == \
+        o.get_department_salary_tree().salary
+
+
+def test_write_organization_to_file_round_trip() -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    o.add_employee(Employee(20, 'Zed', 'Intern', 1500.5, 40), 10)
+    first = StringIO()
+    write_organization_to_file(o, first)
+    first.seek(0)
+    second = StringIO()
+    write_organization_to_file(create_organization_from_file(first), second)
+    assert first.getvalue() == second.getvalue()
+    assert first.getvalue().startswith('1,Alice,CEO,')
+    assert '20,Zed,Intern,1500.5,40,10\n' in first.getvalue()
+
+
+def test_position_index_follows_changes() -> None:
+    e1 = Employee(1, 'Emma Ployee', 'Worker', 10000, 50)
+    e2 = Employee(2, 'Sue Perior', 'Manager', 20000, 30)
+    e3 = Employee(3, 'Bigg Boss', 'CEO', 50000, 60)
+    e1.become_subordinate(e2)
+    e2.become_subordinate(e3)
+    o = Organization(e3)
+    o.add_employee(Employee(4, 'Emma Watson', 'Worker', 30000, 50), 3)
+    assert [e.eid for e in o.get_employees_with_position('Worker')] == [1, 4]
+    e2.position = 'Worker'
+    assert [e.eid for e in o.get_employees_with_position('Worker')] == \
+        [1, 2, 4]
+    assert o.get_employees_with_position('Manager') == []
+    o.promote_employee(1)
+    assert [e.eid for e in o.get_employees_with_position('Worker')] == \
+        [1, 2, 4]
+    o.fire_employee(4)
+    assert [e.eid for e in o.get_employees_with_position('Worker')] == [1, 2]
+    leader = o.get_employee(1).become_leader('Sales')
+    assert o.get_employees_with_position('Worker')[0] is leader
+
+
+def test_salary_index_follows_changes() -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    ivan = o.get_employee(12)
+    assert [e.eid for e in ivan.get_higher_paid_employees()] == \
+        [1, 2, 3, 5, 8, 9, 11]
+    assert o.count_employees_paid_more_than(60000) == 4
+    o.get_employee(8).salary = 45000
+    o.fire_employee(3)
+    assert [e.eid for e in ivan.get_higher_paid_employees()] == [1, 2, 5, 9, 11]
+    assert o.count_employees_paid_more_than(60000) == 3
+    assert o.get_employees_paid_more_than(250000) == []
+
+
+def test_average_salary_totals_in_debug_mode() -> None:
+    o = Organization(Employee(1, 'Alice', 'CEO', 100000.1, 90), debug=True)
+    for eid in range(2, 30):
+        o.add_employee(Employee(eid, 'E', 'Worker', 1000.3 * eid, eid), 1)
+    o.get_employee(5).salary = 12345.67
+    o.get_employee(16).position = 'Manager'
+    o.fire_under_rating(10)
+    o.promote_employee(29)
+    assert o.get_average_salary('Manager') == pytest.approx(16004.8)
+    o.check_salary_totals()
+    workers = o.get_employees_with_position('Worker')
+    assert o.get_average_salary('Worker') == \
+        pytest.approx(sum(e.salary for e in workers) / len(workers))
+
+
+def test_fire_lowest_rated_employee_follows_rating_changes() -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    o.fire_lowest_rated_employee()
+    assert o.get_employee(9) is None
+    o.get_employee(13).rating = 5
+    o.fire_lowest_rated_employee()
+    assert o.get_employee(13) is None
+    o.promote_employee(15)
+    fired = []
+    while o.get_head() is not None:
+        lowest = min(o._employees.values(), key=lambda e: (e.rating, e.eid))
+        fired.append(lowest.eid)
+        o.fire_lowest_rated_employee()
+        assert o.get_employee(lowest.eid) is None
+    assert len(fired) == 10
+
+
+def _random_organization(seed: int, size: int) -> Organization:
+    rng = random.Random(seed)
+    employees = []
+    for eid in rng.sample(range(1, 5 * size), size):
+        employee = Employee(eid, 'E{}'.format(eid), rng.choice('ABC'),
+                            rng.randrange(1, 50) * 100, rng.randrange(40))
+        if employees:
+            employee.become_subordinate(rng.choice(employees))
+        employees.append(employee)
+    return Organization(employees[0])
+
+
+def _structure(o: Organization) -> list:
+    if o.get_head() is None:
+        return []
+    return [(e.eid, e.get_superior() and e.get_superior().eid,
+             [s.eid for s in e.get_direct_subordinates()])
+            for e in o.get_head().iter_subordinates('eid')] + \
+        [(o.get_head().eid, None)]
+
+
+def test_fire_under_rating_matches_firing_one_by_one() -> None:
+    for seed in range(200):
+        batch = _random_organization(seed, 60)
+        one_by_one = _random_organization(seed, 60)
+        rating = seed % 45
+        batch.fire_under_rating(rating)
+        while one_by_one.get_head() is not None and \
+                one_by_one._ratings.peek().rating < rating:
+            one_by_one.fire_lowest_rated_employee()
+        assert _structure(batch) == _structure(one_by_one)
+        assert sorted(batch._employees) == sorted(one_by_one._employees)
+    batch = _random_organization(0, 2000)
+    batch.fire_under_rating(20)
+    assert sorted(batch._positions['A'] + batch._positions['B'] +
+                  batch._positions['C']) == sorted(batch._employees)
+    assert sorted(eid for _, eid in batch._salaries) == sorted(batch._employees)
+
+
+def test_promote_all_matches_promoting_one_by_one() -> None:
+    for seed in range(100):
+        batch = _random_organization(seed, 60)
+        one_by_one = _random_organization(seed, 60)
+        eids = [e.eid for e in one_by_one.get_head().iter_subordinates()]
+        people = {e: (e.eid, e.name, e.rating)
+                  for e in batch._employees.values()}
+        batch.promote_all()
+        one_by_one.promote_employee(one_by_one.get_head().eid)
+        for eid in eids:
+            one_by_one.promote_employee(eid)
+        assert _structure(batch) == _structure(one_by_one)
+        for eid, employee in batch._employees.items():
+            other = one_by_one.get_employee(eid)
+            assert employee.eid == eid
+            assert (employee.rating, employee.position, employee.salary) == \
+                (other.rating, other.position, other.salary)
+        for position in 'ABC':
+            assert [e.eid for e in batch.get_employees_with_position(
+                position)] == [e.eid for e in one_by_one.
+                               get_employees_with_position(position)]
+        assert batch._ratings.peek() is \
+            batch.get_employee(one_by_one._ratings.peek().eid)
+        for e, person in people.items():
+            assert (e.eid, e.name, e.rating) == person
+            assert batch.get_employee(e.eid) is e
+
+
+def test_promotion_keeps_people_in_their_objects() -> None:
+    e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+    e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+    e3 = Leader(3, "Bigg Boss", "CEO", 50000, 20, "Company")
+    e1.become_subordinate(e2)
+    e2.become_subordinate(e3)
+    o = Organization(e3)
+    o.debug = True
+    assert o.get_department_salary_tree().salary == 80000 / 3
+    o.promote_employee(1)
+    assert o.get_head() is e1
+    assert isinstance(e1, Leader) and not isinstance(e3, Leader)
+    assert (e1.name, e1.position, e1.salary) == ("Emma Ployee", "CEO", 50000)
+    assert e2.get_superior() is e3 and e3.get_superior() is e1
+    assert e3.get_department_leader() is e1
+    assert e3.get_position_in_hierarchy() == 'Manager, Company'
+    assert o.get_employee(3) is e3
+    assert o.get_department_salary_tree().salary == 80000 / 3
+    assert e2.swap_up() is e2
+    assert e2.get_superior() is e1 and e3.get_superior() is e2
+    assert (e2.position, e3.position) == ('Manager', 'Worker')
+
+
+def test_obtain_subordinates_matches_obtaining_one_by_one() -> None:
+    for seed in range(100):
+        batch = _random_organization(seed, 60)
+        one_by_one = _random_organization(seed, 60)
+        rng = random.Random(seed)
+        eids = sorted(batch._employees)
+        eid = rng.choice(eids)
+        others = [e for e in eids + [batch.get_head().eid] * 3 if e != eid]
+        ids = [rng.choice(others) for _ in range(rng.randrange(1, 80))]
+        head = batch.get_employee(eid).obtain_subordinates(ids)
+        for id_ in ids:
+            one_by_one.set_head(
+                one_by_one.get_employee(eid).obtain_subordinates([id_]))
+        assert head is batch.get_head()
+        assert head.eid == one_by_one.get_head().eid
+        assert _structure(batch) == _structure(one_by_one)
+        assert all(e.depth() == one_by_one.get_employee(e.eid).depth()
+                   for e in batch._employees.values())
+
+
+def test_closest_common_superiors_match_superior_chains() -> None:
+    o = _random_organization(7, 500)
+    eids = sorted(o._employees)
+    rng = random.Random(7)
+    pairs = [(rng.choice(eids), rng.choice(eids)) for _ in range(2000)]
+
+    def chain(eid: int) -> list:
+        employee = o.get_employee(eid)
+        result = []
+        while employee is not None:
+            result.append(employee)
+            employee = employee.get_superior()
+        return result
+
+    def expected(first: int, second: int) -> Employee:
+        others = chain(second)
+        return next(e for e in chain(first)
+                    if any(e is other for other in others))
+
+    actual = o.get_closest_common_superiors(pairs)
+    assert all(a is expected(*pair) for a, pair in zip(actual, pairs))
+    o.fire_employee(o.get_head().eid)
+    pairs = [pair for pair in pairs if o.get_employee(pair[0]) and
+             o.get_employee(pair[1])]
+    actual = [o.get_employee(first).get_closest_common_superior(second)
+              for first, second in pairs]
+    assert all(a is expected(*pair) for a, pair in zip(actual, pairs))
+
+
+def test_depth_and_head_on_a_deep_chain() -> None:
+    chain = [Employee(1, 'E1', 'Worker', 100, 50)]
+    for eid in range(2, 5001):
+        employee = Employee(eid, 'E{}'.format(eid), 'Worker', 100, 50)
+        employee.become_subordinate(chain[-1])
+        chain.append(employee)
+    assert chain[-1].depth() == 4999
+    assert chain[-1].get_organization_head() is chain[0]
+    o = Organization(chain[0])
+    o.fire_employee(2)
+    assert chain[-1].depth() == 4998
+    boss = Employee(9999, 'Boss', 'CEO', 1000, 90)
+    o.add_employee(boss)
+    assert chain[-1].depth() == 4999
+    assert chain[-1].get_organization_head() is boss
+
+
+def test_department_cache_follows_department_changes() -> None:
+    e1 = Employee(1, "Emma Ployee", "Worker", 10000, 50)
+    e2 = Employee(2, "Sue Perior", "Manager", 20000, 30)
+    e3 = Leader(3, "Bigg Boss", "CEO", 50000, 60, "Company")
+    e1.become_subordinate(e2)
+    e2.become_subordinate(e3)
+    o = Organization(e3)
+    assert e1.get_department_name() == 'Company'
+    assert e1.get_department_leader() is e3
+    assert o.get_department_cache_stats() == (1, 1)
+    l2 = e2.become_leader('Sales')
+    assert e1.get_department_name() == 'Sales'
+    assert e1.get_department_leader() is l2
+    e4 = l2.become_employee()
+    assert e1.get_department_leader() is e3
+    assert e4.get_department_name() == 'Company'
+    o.set_head(e1.change_department_leader())
+    assert o.get_employee(1).get_department_leader() is o.get_employee(1)
+    assert o.get_employee(2).get_department_name() == 'Company'
+    o.fire_employee(1)
+    assert o.get_employee(2).get_department_leader() is None
+    assert o.get_employee(3).get_department_name() == ''
+
+
+def test_iter_positions_in_hierarchy() -> None:
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    positions = list(o.iter_positions_in_hierarchy())
+    assert len(positions) == len(o.get_head().get_all_subordinates()) + 1
+    for employee, position in positions:
+        assert employee.get_position_in_hierarchy() == position
+    leader = next(e for e, _ in positions
+                  if isinstance(e, Leader) and e.get_direct_subordinates())
+    leader.become_leader('Renamed')
+    worker = leader.get_direct_subordinates()[0]
+    assert ', Renamed' in worker.get_position_in_hierarchy()
+    assert dict(o.iter_positions_in_hierarchy())[worker] == \
+        worker.get_position_in_hierarchy()
+
+
+@pytest.mark.parametrize('size', [
+    100000,
+    # A million Employees take a while, so only when asked for.
+    pytest.param(1000000, marks=pytest.mark.skipif(
+        not os.environ.get('RUN_SLOW_TESTS'),
+        reason='set RUN_SLOW_TESTS=1 to run')),
+])
+def test_deep_chain(size: int) -> None:
+    # Far deeper than the recursion limit, yet quick to build.
+    chain = []
+    for eid in range(1, size + 1):
+        if eid % 1000 == 1:
+            employee = Leader(eid, 'E', 'Boss', 100, 50, 'D{}'.format(eid))
+        else:
+            employee = Employee(eid, 'E', 'Worker', 100, 50)
+        if chain:
+            employee.become_subordinate(chain[-1])
+        chain.append(employee)
+    head, bottom = chain[0], chain[-1]
+    o = Organization(head)
+    assert bottom.get_organization_head() is head
+    assert len(bottom._get_all_superiors()) == size - 1
+    assert len(head.get_all_subordinates()) == size - 1
+    department = 'D{}'.format(size - 999)
+    assert bottom.get_department_name() == department
+    assert bottom.get_department_leader() is chain[size - 1000]
+    assert len(bottom._get_position_in_hierarchy_helper()) == size // 1000
+    assert bottom.get_position_in_hierarchy().startswith(
+        'Worker, {}, '.format(department))
+    dst = create_department_salary_tree(o)
+    depth = 0
+    while dst.subdepartments:
+        dst = dst.subdepartments[0]
+        depth += 1
+    assert depth == size // 1000 - 1
+    chain[size - 1501].rating = 100
+    bottom.rating = 99
+    o.promote_employee(size)
+    assert o.get_employee(size).depth() == size - 1500
+
+
+def test_org_snapshot_matches_organization() -> None:
+    pytest.importorskip('numpy')
+    from org_snapshot import OrgSnapshot
+    with open(os.path.join(os.path.dirname(__file__), 'employees.txt')) as f:
+        o = create_organization_from_file(f)
+    snapshot = OrgSnapshot.from_organization(o)
+    assert snapshot.get_average_salary() == o.get_average_salary()
+    assert [e.eid for e in snapshot.get_employees_with_position('Worker')] == \
+        [e.eid for e in o.get_employees_with_position('Worker')]
+    assert [e.eid for e in snapshot.get_employees_paid_more_than(1000)] == \
+        [e.eid for e in o.get_head().get_employees_paid_more_than(1000)]
+    for rating in (25, 55, 85):
+        o.fire_under_rating(rating)
+        snapshot.fire_under_rating(rating)
+        expected = o.get_head().get_all_subordinates()
+        actual = snapshot.to_organization().get_head().get_all_subordinates()
+        assert [(e.eid, e.get_superior().eid) for e in actual] == \
+            [(e.eid, e.get_superior().eid) for e in expected]
+        assert snapshot.get_head().eid == o.get_head().eid
+
+
+def test_org_snapshot_replaces_a_chain_of_heads() -> None:
+    pytest.importorskip('numpy')
+    from org_snapshot import OrgSnapshot
+    chain = [Employee(1, 'E1', 'Worker', 100, 5)]
+    for eid in range(2, 201):
+        employee = Employee(eid, 'E{}'.format(eid), 'Worker', 100,
+                            5 if eid <= 100 else eid % 50)
+        employee.become_subordinate(chain[-1] if eid <= 100 else chain[99])
+        if eid <= 100:
+            chain.append(employee)
+    o = Organization(chain[0])
+    snapshot = OrgSnapshot.from_organization(o)
+    o.fire_under_rating(10)
+    snapshot.fire_under_rating(10)
+    assert snapshot.get_head().eid == o.get_head().eid
+    assert sorted((e.eid, e.get_superior().eid)
+                  for e in o.get_head().get_all_subordinates()) == \
+        sorted((e.eid, e.get_superior().eid)
+               for e in snapshot.to_organization().get_head().
+               get_all_subordinates())
+
 if __name__ == "__main__":
     import pytest
 